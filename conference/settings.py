@@ -3,6 +3,7 @@ import sys
 from pathlib import Path
 from dotenv import load_dotenv
 import dj_database_url
+from corsheaders.defaults import default_headers
 from urllib.parse import urlparse, urlunparse
 from datetime import timedelta
 
@@ -28,6 +29,12 @@ ALLOWED_HOSTS = [
 # Allow all CORS origins (for frontend-backend communication)
 CORS_ALLOW_ALL_ORIGINS = True
 
+# Let the frontend send Idempotency-Key on retried requests
+CORS_ALLOW_HEADERS = (*default_headers, "idempotency-key")
+
+# Let the frontend read the idempotent replay marker and throttling headers
+CORS_EXPOSE_HEADERS = ["Idempotent-Replayed", "Retry-After", "RateLimit-Policy", "RateLimit-Limit", "RateLimit-Remaining", "RateLimit-Reset"]
+
 # Installed apps
 INSTALLED_APPS = [
     "corsheaders",  # Support for CORS headers
@@ -45,6 +52,7 @@ INSTALLED_APPS = [
 # Middleware configuration
 MIDDLEWARE = [
     "corsheaders.middleware.CorsMiddleware",  # CORS middleware (should be on top)
+    "reservation.middleware.RateLimitHeadersMiddleware",  # RateLimit-* headers from the throttles
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -91,6 +99,26 @@ if "test" in sys.argv:
     os.environ["DATABASE_URL"] = test_url
     DATABASES["default"] = dj_database_url.config(conn_max_age=600, ssl_require=True)
 
+# Cache used for throttling counters: Redis shared by all workers when REDIS_URL is set (render.yaml
+# provisions it), per-process memory otherwise, which is only suitable for local development
+if os.getenv("REDIS_URL"):
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": os.getenv("REDIS_URL"),
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        }
+    }
+
+# Email used by background notification tasks (printed to the console unless configured)
+EMAIL_BACKEND = os.getenv("EMAIL_BACKEND", "django.core.mail.backends.console.EmailBackend")
+DEFAULT_FROM_EMAIL = os.getenv("DEFAULT_FROM_EMAIL", "noreply@confroom.local")
+
 # Skip password validation rules (not needed for this project)
 AUTH_PASSWORD_VALIDATORS = []
 
@@ -110,7 +138,21 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": [
         "rest_framework_simplejwt.authentication.JWTAuthentication",
-    ]
+    ],
+    # Token bucket per user (or IP when anonymous) and per endpoint class, see reservation/throttling.py
+    "DEFAULT_THROTTLE_CLASSES": [
+        "reservation.throttling.ScopedTokenBucketThrottle",
+    ],
+    # Proxies in front of the app (Render's load balancer). The throttles key anonymous clients
+    # on the address this many hops from the end of X-Forwarded-For, so a client can't pick
+    # its own bucket by sending the header itself
+    "NUM_PROXIES": int(os.getenv("NUM_PROXIES", "1")),
+    "DEFAULT_THROTTLE_RATES": {
+        "auth": "10/min",           # token and register views (password hashing)
+        "writes": "60/min",         # POST/PUT/PATCH/DELETE
+        "availability": "30/min",   # reserved-times and available-dates
+        "reads": "300/min",         # other GET requests
+    },
 }
 
 # SIMPLE_JWT settings
@@ -128,3 +170,8 @@ SIMPLE_JWT = {
     "AUTH_TOKEN_CLASSES": ("rest_framework_simplejwt.tokens.AccessToken",),
     "TOKEN_OBTAIN_SERIALIZER": "reservation.serializers.CustomTokenObtainPairSerializer",
 }
+
+# Idempotency-Key settings (replay window for stored responses of retried requests)
+IDEMPOTENCY_KEY_TTL = timedelta(hours=24)
+IDEMPOTENCY_WAIT_SECONDS = 5
+IDEMPOTENCY_LOCK_TIMEOUT = timedelta(minutes=1)  # longer than the gunicorn worker timeout
@@ -0,0 +1,53 @@
+"""
+Warm-up helpers for cold starts.
+
+Used by gunicorn.conf.py: warm_up_app() runs once in the master process before
+workers are forked (preload_app), warm_database() runs in each worker before it
+accepts requests, since database connections must not be shared across forks.
+"""
+
+import importlib
+import logging
+
+from django.contrib.auth.hashers import get_hashers
+from django.db import connections
+from django.urls import get_resolver
+
+logger = logging.getLogger(__name__)
+
+# Modules that are otherwise only imported while handling the first request
+WARM_UP_MODULES = [
+    'rest_framework_simplejwt.authentication',
+    'rest_framework_simplejwt.tokens',
+    'rest_framework_simplejwt.state',
+    'reservation.serializers',
+    'reservation.throttling',
+]
+
+
+def warm_up_app():
+    """Import views and lazily-loaded modules and build the URL resolver caches."""
+    for module in WARM_UP_MODULES:
+        importlib.import_module(module)
+
+    # Importing the URLconf imports every view; reverse_dict compiles all URL patterns
+    resolver = get_resolver()
+    resolver.url_patterns
+    resolver.reverse_dict
+
+    # simplejwt resolves its token classes on first access
+    from rest_framework_simplejwt.settings import api_settings as jwt_settings
+    jwt_settings.AUTH_TOKEN_CLASSES
+
+    # Instantiates the password hashers used by /api/token/
+    get_hashers()
+
+
+def warm_database():
+    """Open the database connections so the first request doesn't pay for the connect/TLS handshake."""
+    for connection in connections.all():
+        try:
+            connection.ensure_connection()
+        except Exception:
+            # Never keep the worker from booting; the first request will retry the connection
+            logger.warning("Could not open database connection %r during warm-up", connection.alias, exc_info=True)
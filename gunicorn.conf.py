@@ -0,0 +1,17 @@
+# Gunicorn settings for the Render deployment (picked up from the working directory)
+
+# Load Django, the views and the URL patterns once in the master process so
+# workers are forked with everything already imported
+preload_app = True
+
+
+def when_ready(server):
+    # Runs in the master after the app is loaded and before any worker is forked
+    from conference.warmup import warm_up_app
+    warm_up_app()
+
+
+def post_worker_init(worker):
+    # Runs in each worker before it accepts requests
+    from conference.warmup import warm_database
+    warm_database()
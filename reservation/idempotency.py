@@ -0,0 +1,113 @@
+import functools
+import hashlib
+import json
+import time
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+
+from .models import IdempotencyKey
+
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+
+# Settings (see conference/settings.py) are read at call time:
+# IDEMPOTENCY_KEY_TTL: how long a stored response can be replayed
+# IDEMPOTENCY_LOCK_TIMEOUT: a record still without a response after this long belongs to a request
+#   whose worker died (timeout, OOM kill, redeploy); the key is released so retries can run again
+# IDEMPOTENCY_WAIT_SECONDS: how long a duplicate waits for the original request before giving up with 409
+IDEMPOTENCY_POLL_INTERVAL = 0.1
+
+
+def _fingerprint(request):
+    # Same key must always be sent with the same method, path and body
+    body = json.dumps(request.data, sort_keys=True, cls=DjangoJSONEncoder)
+    raw = f"{request.method}\n{request.path}\n{body}"
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+def _claim(user, key, fingerprint):
+    """Insert a pending record for the key, or return the existing one (created=False)."""
+    now = timezone.now()
+    IdempotencyKey.objects.filter(created_at__lt=now - settings.IDEMPOTENCY_KEY_TTL).delete()
+    # Conditional delete, so concurrent retries can't remove a record that another one just claimed
+    IdempotencyKey.objects.filter(
+        user=user, key=key, response_status__isnull=True, created_at__lt=now - settings.IDEMPOTENCY_LOCK_TIMEOUT,
+    ).delete()
+    try:
+        with transaction.atomic():
+            record = IdempotencyKey.objects.create(user=user, key=key, fingerprint=fingerprint)
+        return record, True
+    except IntegrityError:
+        # The unique (user, key) constraint lets concurrent duplicates race safely here
+        return IdempotencyKey.objects.filter(user=user, key=key).first(), False
+
+
+def _replay(record, fingerprint):
+    if record is None:
+        # The original request failed and released the key in the meantime
+        return Response({"error": "The original request did not complete. Please retry."},
+                        status=status.HTTP_409_CONFLICT, headers={'Retry-After': '1'})
+    if record.fingerprint != fingerprint:
+        return Response({"error": "Idempotency-Key has already been used for a different request."},
+                        status=status.HTTP_422_UNPROCESSABLE_ENTITY)
+
+    # Coalesce concurrent duplicates: wait for the original request to store its response
+    deadline = time.monotonic() + settings.IDEMPOTENCY_WAIT_SECONDS
+    while record.response_status is None:
+        if time.monotonic() >= deadline:
+            return Response({"error": "A request with this Idempotency-Key is still being processed."},
+                            status=status.HTTP_409_CONFLICT, headers={'Retry-After': '1'})
+        time.sleep(IDEMPOTENCY_POLL_INTERVAL)
+        record = IdempotencyKey.objects.filter(pk=record.pk).first()
+        if record is None:
+            return _replay(None, fingerprint)
+
+    return Response(record.response_body, status=record.response_status,
+                    headers={'Idempotent-Replayed': 'true'})
+
+
+def idempotent(view_method):
+    """
+    Make a view action safe to retry with an Idempotency-Key header.
+
+    The first request stores its response; retries with the same key return it
+    without running the action again. Requests without the header are unaffected.
+    """
+    @functools.wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        key = request.headers.get(IDEMPOTENCY_HEADER)
+        if not key:
+            return view_method(self, request, *args, **kwargs)
+        if len(key) > 255:
+            return Response({"error": "Idempotency-Key must be at most 255 characters."},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        fingerprint = _fingerprint(request)
+        record, created = _claim(request.user, key, fingerprint)
+        if not created:
+            return _replay(record, fingerprint)
+
+        try:
+            response = view_method(self, request, *args, **kwargs)
+        except Exception as exc:
+            try:
+                # Turn validation/permission errors into responses so they are replayed too
+                response = self.handle_exception(exc)
+            except Exception:
+                record.delete()
+                raise
+
+        if response.status_code >= 500:
+            # Server errors are not stored so that the client can retry them
+            record.delete()
+        else:
+            record.response_status = response.status_code
+            record.response_body = response.data
+            record.save(update_fields=['response_status', 'response_body'])
+        return response
+
+    return wrapper
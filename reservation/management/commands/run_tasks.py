@@ -0,0 +1,77 @@
+import signal
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connection
+
+# Registers the reservation tasks
+import reservation.tasks  # noqa: F401
+from reservation.taskqueue import claim_next, heartbeat_loop, purge_done, requeue_stale, run_task
+
+
+class Command(BaseCommand):
+    help = "Run queued background tasks."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=1, help="Number of worker threads.")
+        parser.add_argument('--poll-interval', type=float, default=1.0, help="Seconds to wait when the queue is empty.")
+        parser.add_argument('--once', action='store_true', help="Exit once no task is due instead of polling.")
+        parser.add_argument('--requeue-interval', type=float, default=60.0,
+                            help="Seconds between checks for tasks left running by a dead worker "
+                                 "(finished tasks past their retention are deleted at the same time).")
+
+    def handle(self, *args, **options):
+        self.stop = threading.Event()
+        signal.signal(signal.SIGTERM, lambda signum, frame: self.stop.set())
+        signal.signal(signal.SIGINT, lambda signum, frame: self.stop.set())
+
+        self.requeue_interval = options['requeue_interval']
+        # One heartbeat thread keeps locked_at fresh for every task this worker runs
+        heartbeat_stop = threading.Event()
+        heartbeat = threading.Thread(target=heartbeat_loop, args=(heartbeat_stop,), daemon=True)
+        heartbeat.start()
+
+        concurrency = options['concurrency']
+        if concurrency == 1:
+            processed = self.work(options['poll_interval'], options['once'])
+        else:
+            counts = [0] * concurrency
+            threads = [
+                threading.Thread(target=self.work_thread, args=(counts, i, options['poll_interval'], options['once']))
+                for i in range(concurrency)
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            processed = sum(counts)
+        heartbeat_stop.set()
+        heartbeat.join()
+        self.stdout.write(self.style.SUCCESS(f"Processed {processed} task(s)."))
+
+    def work_thread(self, counts, index, poll_interval, once):
+        try:
+            counts[index] = self.work(poll_interval, once)
+        finally:
+            # Each thread has its own database connection
+            connection.close()
+
+    def work(self, poll_interval, once):
+        processed = 0
+        next_requeue = 0
+        while not self.stop.is_set():
+            close_old_connections()
+            if time.monotonic() >= next_requeue:
+                requeue_stale()
+                purge_done()
+                next_requeue = time.monotonic() + self.requeue_interval
+            task_obj = claim_next()
+            if task_obj is None:
+                if once:
+                    break
+                self.stop.wait(poll_interval)
+                continue
+            run_task(task_obj)
+            processed += 1
+        return processed
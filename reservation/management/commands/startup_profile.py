@@ -0,0 +1,103 @@
+import json
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+# Runs in a fresh interpreter so every measurement is a real cold start
+FIRST_RESPONSE_SCRIPT = """
+import json, os, sys, time
+start = time.perf_counter()
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "conference.settings")
+from django.core.wsgi import get_wsgi_application
+application = get_wsgi_application()
+timings = {"django_setup": time.perf_counter() - start}
+
+if sys.argv[2] == "warm":
+    mark = time.perf_counter()
+    from conference.warmup import warm_up_app, warm_database
+    warm_up_app()
+    warm_database()
+    timings["warm_up"] = time.perf_counter() - mark
+
+from wsgiref.util import setup_testing_defaults
+environ = {"PATH_INFO": sys.argv[1], "HTTP_HOST": "localhost", "SERVER_NAME": "localhost"}
+setup_testing_defaults(environ)
+result = {}
+def start_response(status, headers, exc_info=None):
+    result["status"] = status
+mark = time.perf_counter()
+body = b"".join(application(environ, start_response))
+timings["first_request"] = time.perf_counter() - mark
+timings["total"] = time.perf_counter() - start
+print(json.dumps({"status": result.get("status"), "timings": timings}))
+"""
+
+IMPORT_TIME_SCRIPT = """
+import os
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "conference.settings")
+import django
+django.setup()
+from django.urls import get_resolver
+get_resolver().reverse_dict
+"""
+
+
+class Command(BaseCommand):
+    help = "Report import time per module and time-to-first-response for a cold process, with and without warm-up."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', default='/api/rooms/', help="URL requested as the first request.")
+        parser.add_argument('--top', type=int, default=20, help="Number of slowest modules to list.")
+        parser.add_argument('--runs', type=int, default=3, help="Cold starts per mode; the median is reported.")
+
+    def run_python(self, *args):
+        return subprocess.run(
+            [sys.executable, *args], cwd=settings.BASE_DIR, capture_output=True, text=True, check=True,
+        )
+
+    def report_import_times(self, top):
+        stderr = self.run_python('-X', 'importtime', '-c', IMPORT_TIME_SCRIPT).stderr
+        modules = []
+        for line in stderr.splitlines():
+            # Format: "import time: <self us> | <cumulative us> | <module>"
+            if not line.startswith('import time:') or 'self [us]' in line:
+                continue
+            self_us, cumulative_us, name = line[len('import time:'):].split('|')
+            modules.append((int(self_us), int(cumulative_us), name.rstrip()))
+
+        total = sum(self_us for self_us, _, _ in modules)
+        self.stdout.write(self.style.MIGRATE_HEADING(f"Import time (django.setup + URLconf): {total / 1000:.1f} ms over {len(modules)} modules"))
+        self.stdout.write(f"{'self ms':>9} {'cumul. ms':>10}  module")
+        for self_us, cumulative_us, name in sorted(modules, reverse=True)[:top]:
+            self.stdout.write(f"{self_us / 1000:9.1f} {cumulative_us / 1000:10.1f}  {name.strip()}")
+
+    def measure_first_response(self, path, mode, runs):
+        results = []
+        for _ in range(runs):
+            output = self.run_python('-c', FIRST_RESPONSE_SCRIPT, path, mode).stdout
+            results.append(json.loads(output.strip().splitlines()[-1]))
+        # Median run by total time
+        results.sort(key=lambda result: result['timings']['total'])
+        return results[len(results) // 2]
+
+    def handle(self, *args, **options):
+        self.report_import_times(options['top'])
+
+        self.stdout.write("")
+        self.stdout.write(self.style.MIGRATE_HEADING(f"Time to first response for {options['path']} (median of {options['runs']} cold starts)"))
+        cold = self.measure_first_response(options['path'], 'cold', options['runs'])
+        warm = self.measure_first_response(options['path'], 'warm', options['runs'])
+        for label, result in (('Without warm-up', cold), ('With warm-up', warm)):
+            timings = result['timings']
+            self.stdout.write(f"{label} [{result['status']}]")
+            for phase in ('django_setup', 'warm_up', 'first_request', 'total'):
+                if phase in timings:
+                    self.stdout.write(f"  {phase:<14} {timings[phase] * 1000:8.1f} ms")
+
+        saved = (cold['timings']['first_request'] - warm['timings']['first_request']) * 1000
+        self.stdout.write(self.style.SUCCESS(
+            f"First request is {saved:.1f} ms faster once the worker has been warmed up "
+            "(warm-up runs before gunicorn workers accept traffic)."
+        ))
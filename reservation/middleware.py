@@ -0,0 +1,18 @@
+class RateLimitHeadersMiddleware:
+    """
+    Adds RateLimit-* headers describing the token bucket used for the request
+    (set by reservation.throttling.TokenBucketThrottle).
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        state = getattr(request, 'ratelimit', None)
+        if state is not None:
+            response['RateLimit-Policy'] = f"{state['limit']};policy=token-bucket;scope={state['scope']}"
+            response['RateLimit-Limit'] = str(state['limit'])
+            response['RateLimit-Remaining'] = str(state['remaining'])
+            response['RateLimit-Reset'] = str(state['reset'])
+        return response
@@ -0,0 +1,182 @@
+"""
+A small database-backed task queue.
+
+Tasks are registered with @task and queued with enqueue(), which inserts the row
+only once the surrounding transaction commits. The run_tasks management command
+claims due tasks (SELECT ... FOR UPDATE SKIP LOCKED where the database supports it,
+a conditional UPDATE on SQLite) and retries failures with exponential backoff.
+"""
+
+import logging
+import threading
+import traceback
+from datetime import timedelta
+
+from django.db import close_old_connections, connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Task
+
+logger = logging.getLogger(__name__)
+
+# Registered task functions by name
+registry = {}
+
+# Retry delay: RETRY_BASE_DELAY * 2 ** (attempt - 1), capped at RETRY_MAX_DELAY
+RETRY_BASE_DELAY = timedelta(seconds=10)
+RETRY_MAX_DELAY = timedelta(hours=1)
+
+# While a task runs, the worker's heartbeat thread refreshes its locked_at this often
+HEARTBEAT_INTERVAL = timedelta(seconds=30)
+
+# Finished tasks are deleted after this long so the table doesn't grow without limit
+DONE_RETENTION = timedelta(days=7)
+
+# Tasks this process is running right now, refreshed by heartbeat_loop()
+running_tasks = set()
+running_tasks_lock = threading.Lock()
+
+# A running task without a heartbeat for this long is assumed lost (its worker died) and requeued.
+# Long tasks keep heartbeating, so this only needs to cover a few missed heartbeats
+LOCK_TIMEOUT = timedelta(minutes=2)
+
+
+def retry_delay(attempts):
+    """Backoff before the next attempt of a task that has run `attempts` times."""
+    return min(RETRY_BASE_DELAY * 2 ** (attempts - 1), RETRY_MAX_DELAY)
+
+
+def task(func=None, *, name=None):
+    """Register a function so it can be queued by name."""
+    def register(func):
+        func.task_name = name or f"{func.__module__}.{func.__name__}"
+        registry[func.task_name] = func
+        return func
+    if func is not None:
+        return register(func)
+    return register
+
+
+def enqueue(func_or_name, max_attempts=5, **payload):
+    """Queue a task once the current transaction commits (immediately in autocommit mode)."""
+    name = getattr(func_or_name, 'task_name', func_or_name)
+    if name not in registry:
+        raise ValueError(f"Unknown task: {name}")
+    transaction.on_commit(
+        lambda: Task.objects.create(name=name, payload=payload, max_attempts=max_attempts)
+    )
+
+
+def enqueue_many(func_or_name, payloads, max_attempts=5):
+    """Queue one task per payload with a single INSERT once the current transaction commits."""
+    name = getattr(func_or_name, 'task_name', func_or_name)
+    if name not in registry:
+        raise ValueError(f"Unknown task: {name}")
+    payloads = list(payloads)
+    if payloads:
+        transaction.on_commit(lambda: Task.objects.bulk_create([
+            Task(name=name, payload=payload, max_attempts=max_attempts) for payload in payloads
+        ]))
+
+
+def claim_next():
+    """Mark the next due task as running and return it, or None if nothing is due."""
+    now = timezone.now()
+    with transaction.atomic():
+        queryset = Task.objects.filter(status='pending', run_at__lte=now).order_by('run_at')
+        if connection.features.has_select_for_update_skip_locked:
+            # Workers skip rows already being claimed instead of waiting on them
+            queryset = queryset.select_for_update(skip_locked=True)
+        task_obj = queryset.first()
+        if task_obj is None:
+            return None
+        # The status condition keeps two SQLite workers from claiming the same row
+        claimed = Task.objects.filter(pk=task_obj.pk, status='pending').update(
+            status='running', attempts=task_obj.attempts + 1, locked_at=now, updated_at=now,
+        )
+    if not claimed:
+        return None
+    task_obj.refresh_from_db()
+    return task_obj
+
+
+def heartbeat_loop(stop):
+    """
+    Refresh locked_at of every task this process is running until `stop` is set.
+    The worker runs one of these threads, so there is a single extra database
+    connection per worker rather than one per task.
+    """
+    try:
+        while not stop.wait(HEARTBEAT_INTERVAL.total_seconds()):
+            with running_tasks_lock:
+                pks = list(running_tasks)
+            if pks:
+                close_old_connections()
+                Task.objects.filter(pk__in=pks, status='running').update(locked_at=timezone.now())
+    finally:
+        connection.close()
+
+
+def run_task(task_obj):
+    """Run a claimed task and record the result, scheduling a retry on failure."""
+    func = registry.get(task_obj.name)
+    with running_tasks_lock:
+        running_tasks.add(task_obj.pk)
+    try:
+        if func is None:
+            raise LookupError(f"Unknown task: {task_obj.name}")
+        func(**task_obj.payload)
+    except Exception:
+        error = traceback.format_exc()
+        if task_obj.attempts >= task_obj.max_attempts:
+            logger.error("Task %s failed after %d attempts", task_obj, task_obj.attempts)
+            Task.objects.filter(pk=task_obj.pk).update(
+                status='failed', last_error=error, locked_at=None, updated_at=timezone.now(),
+            )
+        else:
+            delay = retry_delay(task_obj.attempts)
+            logger.warning("Task %s failed, retrying in %s", task_obj, delay)
+            Task.objects.filter(pk=task_obj.pk).update(
+                status='pending', last_error=error, locked_at=None,
+                run_at=timezone.now() + delay, updated_at=timezone.now(),
+            )
+        return False
+    finally:
+        with running_tasks_lock:
+            running_tasks.discard(task_obj.pk)
+    Task.objects.filter(pk=task_obj.pk).update(status='done', locked_at=None, updated_at=timezone.now())
+    return True
+
+
+def requeue_stale():
+    """
+    Handle tasks left running by a worker that died: fail the ones that have used all
+    their attempts (a task that keeps killing its worker must not be retried forever)
+    and put the rest back with the usual retry backoff.
+    """
+    now = timezone.now()
+    stale = Task.objects.filter(status='running', locked_at__lt=now - LOCK_TIMEOUT)
+
+    failed = stale.filter(attempts__gte=F('max_attempts')).update(
+        status='failed', last_error="Worker died while running the task.", locked_at=None, updated_at=now,
+    )
+    if failed:
+        logger.error("Failed %d task(s) whose worker died on the last attempt", failed)
+
+    requeued = 0
+    for pk, attempts in stale.values_list('pk', 'attempts'):
+        # Conditional on the row still being stale, in case its worker was only slow
+        requeued += stale.filter(pk=pk).update(
+            status='pending', last_error="Worker died while running the task.", locked_at=None,
+            run_at=now + retry_delay(attempts), updated_at=now,
+        )
+    if requeued:
+        logger.warning("Requeued %d task(s) whose worker stopped responding", requeued)
+    return requeued
+
+
+def purge_done():
+    """Delete finished tasks older than DONE_RETENTION; failed ones are kept for inspection."""
+    deleted, _ = Task.objects.filter(status='done', updated_at__lt=timezone.now() - DONE_RETENTION).delete()
+    return deleted
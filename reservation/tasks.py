@@ -0,0 +1,30 @@
+from django.core.mail import send_mail
+
+from .models import Reservation
+from .taskqueue import task
+
+STATUS_MESSAGES = {
+    'created': "Your reservation request has been received and is pending approval.",
+    'approved': "Your reservation has been approved.",
+    'rejected': "Your reservation has been rejected.",
+}
+
+
+@task
+def notify_reservation(reservation_id, event):
+    """Email the reservation owner about a new request or a status change."""
+    reservation = Reservation.objects.select_related('room', 'user').filter(pk=reservation_id).first()
+    if reservation is None or not reservation.user.email:
+        # Deleted in the meantime or nobody to notify
+        return
+    send_mail(
+        subject=f"Reservation {event}: {reservation.title}",
+        message=(
+            f"{STATUS_MESSAGES[event]}\n\n"
+            f"Room: {reservation.room.name}\n"
+            f"Date: {reservation.date}\n"
+            f"Time: {reservation.start_time:%H:%M} - {reservation.end_time:%H:%M}\n"
+        ),
+        from_email=None,
+        recipient_list=[reservation.user.email],
+    )
@@ -1,22 +1,49 @@
-from django.test import TestCase
+from django.conf import settings
+from django.core import mail
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache.backends.locmem import LocMemCache
+from rest_framework.parsers import JSONParser
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+from unittest import mock, skipUnless
+import os
+import threading
+from io import StringIO
+import time as time_module
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.core.cache import caches
 from rest_framework.test import APIClient
 from rest_framework import status
 from django.contrib.auth.models import User
-from .models import Room, Reservation
+from .models import IdempotencyKey, Room, Reservation, Task
+from .idempotency import _fingerprint
+from .taskqueue import claim_next, heartbeat_loop, purge_done, requeue_stale, run_task, task
+from .throttling import GCRA_SCRIPT, ScopedTokenBucketThrottle, TokenBucketThrottle
 from datetime import date, time, timedelta
+from django.utils import timezone
 from django.core.management import call_command
 
-class ReservationAPITests(TestCase):
+
+class ReservationFixturesMixin:
+    """Common fixtures: an admin, a regular user, a room and an API client."""
     def setUp(self):
-         call_command("migrate", verbosity=0)
-         # Create users
+         super().setUp()
+         # Throttle buckets live in the cache; start every test with full buckets
+         cache.clear()
          self.admin = User.objects.create_superuser(username="admin", email="admin@example.com", password="adminpass")
          self.user = User.objects.create_user(username="user", email="user@example.com", password="userpass")
-         # Create a test room
          self.room = Room.objects.create(name="Test Room", capacity=10, location="Test Location")
-         # Create API client
          self.client = APIClient()
 
+
+class ReservationAPITests(ReservationFixturesMixin, TestCase):
+    def setUp(self):
+         call_command("migrate", verbosity=0)
+         super().setUp()
+
     def test_obtain_jwt_token(self):
          """Test that a user can obtain a JWT token by posting to /api/token/."""
          url = "/api/token/"
@@ -141,3 +168,372 @@ class ReservationAPITests(TestCase):
          response = self.client.get(url, format="json")
          self.assertEqual(response.status_code, status.HTTP_200_OK, "Expected 200 OK when user fetches reservations.")
          self.assertEqual(len(response.data), 1, "Expected user to see only their own reservation (the one created in setUp).")
+
+class IdempotencyKeyTests(ReservationFixturesMixin, TestCase):
+    def setUp(self):
+         super().setUp()
+         self.data = {
+             "room": self.room.id,
+             "title": "Retried Reservation",
+             "date": date.today().isoformat(),
+             "start_time": time(9, 0).isoformat(),
+             "end_time": time(10, 0).isoformat(),
+         }
+
+    def test_retried_create_is_replayed(self):
+         """Test that retrying POST /api/reservations/ with the same Idempotency-Key returns the original response without creating a second reservation."""
+         self.client.force_authenticate(user=self.user)
+         first = self.client.post("/api/reservations/", self.data, format="json", HTTP_IDEMPOTENCY_KEY="abc-123")
+         self.assertEqual(first.status_code, status.HTTP_201_CREATED, "Expected 201 Created for the first request.")
+         second = self.client.post("/api/reservations/", self.data, format="json", HTTP_IDEMPOTENCY_KEY="abc-123")
+         self.assertEqual(second.status_code, status.HTTP_201_CREATED, "Expected the replayed response to keep the original status.")
+         self.assertEqual(second.data["id"], first.data["id"], "Expected the replayed response to return the same reservation.")
+         self.assertEqual(second["Idempotent-Replayed"], "true", "Expected the replay to be marked in the response headers.")
+         self.assertEqual(Reservation.objects.count(), 1, "Expected only one reservation to be created.")
+
+    def test_reused_key_with_different_body_rejected(self):
+         """Test that reusing an Idempotency-Key for a different request body returns 422."""
+         self.client.force_authenticate(user=self.user)
+         self.client.post("/api/reservations/", self.data, format="json", HTTP_IDEMPOTENCY_KEY="abc-123")
+         self.data["title"] = "Different Reservation"
+         response = self.client.post("/api/reservations/", self.data, format="json", HTTP_IDEMPOTENCY_KEY="abc-123")
+         self.assertEqual(response.status_code, status.HTTP_422_UNPROCESSABLE_ENTITY, "Expected 422 when the key is reused for another request.")
+
+    def test_abandoned_key_is_reclaimed(self):
+         """Test that a key left without a response by a crashed request can be retried once the lock timeout has passed."""
+         IdempotencyKey.objects.create(user=self.user, key="abc-123", fingerprint="whatever")
+         IdempotencyKey.objects.update(created_at=timezone.now() - timedelta(minutes=5))
+         self.client.force_authenticate(user=self.user)
+         response = self.client.post("/api/reservations/", self.data, format="json", HTTP_IDEMPOTENCY_KEY="abc-123")
+         self.assertEqual(response.status_code, status.HTTP_201_CREATED, "Expected the retry to run instead of returning 409.")
+         self.assertEqual(IdempotencyKey.objects.get().response_status, 201, "Expected the reclaimed key to store the new response.")
+
+    def pending_record(self, key):
+         """Create the record an in-flight request with self.data would hold."""
+         request = Request(APIRequestFactory().post("/api/reservations/", self.data, format="json"), parsers=[JSONParser()])
+         return IdempotencyKey.objects.create(user=self.user, key=key, fingerprint=_fingerprint(request))
+
+    @override_settings(IDEMPOTENCY_WAIT_SECONDS=0.2)
+    def test_duplicate_of_unfinished_request_gets_409(self):
+         """Test that a duplicate gives up with 409 and Retry-After when the original doesn't finish within IDEMPOTENCY_WAIT_SECONDS."""
+         self.pending_record("abc-123")
+         self.client.force_authenticate(user=self.user)
+         response = self.client.post("/api/reservations/", self.data, format="json", HTTP_IDEMPOTENCY_KEY="abc-123")
+         self.assertEqual(response.status_code, status.HTTP_409_CONFLICT, "Expected 409 while the original request is still running.")
+         self.assertEqual(response["Retry-After"], "1", "Expected a Retry-After header on the 409.")
+         self.assertEqual(Reservation.objects.count(), 0, "Expected the duplicate not to create a reservation.")
+
+    def test_duplicate_waits_for_original_response(self):
+         """Test that a duplicate arriving while the original runs returns the original's response once it is stored."""
+         record = self.pending_record("abc-123")
+
+         def original_finishes(seconds):
+             # The original request stores its response while the duplicate is polling
+             IdempotencyKey.objects.filter(pk=record.pk).update(response_status=201, response_body={"id": 42})
+
+         self.client.force_authenticate(user=self.user)
+         with mock.patch("reservation.idempotency.time.sleep", side_effect=original_finishes) as sleep:
+             response = self.client.post("/api/reservations/", self.data, format="json", HTTP_IDEMPOTENCY_KEY="abc-123")
+         self.assertTrue(sleep.called, "Expected the duplicate to poll for the original response.")
+         self.assertEqual(response.status_code, status.HTTP_201_CREATED, "Expected the original status to be replayed.")
+         self.assertEqual(response.data, {"id": 42}, "Expected the original body to be replayed.")
+         self.assertEqual(response["Idempotent-Replayed"], "true", "Expected the replay to be marked in the response headers.")
+         self.assertEqual(Reservation.objects.count(), 0, "Expected the duplicate not to create a reservation.")
+
+    def test_retried_approve_is_replayed(self):
+         """Test that retrying POST /api/reservations/{id}/approve/ with the same Idempotency-Key does not save the reservation again."""
+         reservation = Reservation.objects.create(room=self.room, user=self.user, title="Pending", date=date.today(), start_time=time(11, 0), end_time=time(12, 0))
+         self.client.force_authenticate(user=self.admin)
+         url = f"/api/reservations/{reservation.id}/approve/"
+         first = self.client.post(url, format="json", HTTP_IDEMPOTENCY_KEY="approve-1")
+         self.assertEqual(first.status_code, status.HTTP_200_OK, "Expected 200 OK when approving a reservation.")
+         reservation.refresh_from_db()
+         updated_at = reservation.updated_at
+         second = self.client.post(url, format="json", HTTP_IDEMPOTENCY_KEY="approve-1")
+         self.assertEqual(second.status_code, status.HTTP_200_OK, "Expected the replayed approve to return 200 OK.")
+         reservation.refresh_from_db()
+         self.assertEqual(reservation.updated_at, updated_at, "Expected the replay not to touch the reservation row.")
+
+
+@override_settings(REST_FRAMEWORK={**settings.REST_FRAMEWORK, "DEFAULT_THROTTLE_RATES": {"auth": "2/min", "availability": "30/min"}})
+class ThrottlingTests(ReservationFixturesMixin, TestCase):
+    def test_auth_endpoint_throttled_after_burst(self):
+         """Test that /api/token/ allows a burst of 2 requests and then returns 429 with Retry-After."""
+         data = {"username": "user", "password": "userpass"}
+         response = self.client.post("/api/token/", data, format="json")
+         self.assertEqual(response.status_code, status.HTTP_200_OK, "Expected 200 OK for the first token request.")
+         self.assertEqual(response["RateLimit-Limit"], "2", "Expected the auth bucket size in RateLimit-Limit.")
+         self.assertEqual(response["RateLimit-Remaining"], "1", "Expected one token left after the first request.")
+         self.client.post("/api/token/", data, format="json")
+         response = self.client.post("/api/token/", data, format="json")
+         self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS, "Expected 429 once the auth bucket is empty.")
+         self.assertIn("Retry-After", response, "Expected a Retry-After header on throttled responses.")
+
+    def test_scopes_have_separate_budgets(self):
+         """Test that exhausting the auth bucket does not throttle availability reads."""
+         data = {"username": "user", "password": "userpass"}
+         for _ in range(3):
+             self.client.post("/api/token/", data, format="json")
+         response = self.client.get("/api/reserved-times/", format="json")
+         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, "Expected the availability endpoint to run (400 for missing params), not 429.")
+         self.assertEqual(response["RateLimit-Limit"], "30", "Expected the availability bucket size in RateLimit-Limit.")
+
+    def test_spoofed_forwarded_for_does_not_open_new_bucket(self):
+         """Test that changing the client-supplied part of X-Forwarded-For doesn't bypass the auth bucket."""
+         data = {"username": "user", "password": "userpass"}
+         for i in range(2):
+             # The proxy appends the real client address after whatever the client sent
+             self.client.post("/api/token/", data, format="json", HTTP_X_FORWARDED_FOR=f"10.0.0.{i}, 203.0.113.7")
+         response = self.client.post("/api/token/", data, format="json", HTTP_X_FORWARDED_FOR="10.0.0.99, 203.0.113.7")
+         self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS, "Expected a spoofed X-Forwarded-For to share the client's bucket.")
+
+    def test_concurrent_requests_on_idle_bucket(self):
+         """Test that two requests updating an idle bucket at the same time each take exactly one token."""
+         class AvailabilityView:
+             throttle_scope = "availability"
+
+         def make_request():
+             request = Request(APIRequestFactory().get("/api/reserved-times/"))
+             request.user = AnonymousUser()
+             return request
+
+         # Use the bucket once, then leave it idle for ten minutes
+         clock = [1000.0]
+         timer = mock.patch.object(ScopedTokenBucketThrottle, "timer", staticmethod(lambda: clock[0]))
+         timer.start()
+         self.addCleanup(timer.stop)
+         ScopedTokenBucketThrottle().allow_request(make_request(), AvailabilityView())
+         clock[0] += 600
+
+         def slowed(operation):
+             # Pause after every cache call so the two requests' reads and writes interleave
+             def wrapper(*args, **kwargs):
+                 value = operation(*args, **kwargs)
+                 time_module.sleep(0.02)
+                 return value
+             return wrapper
+
+         barrier = threading.Barrier(2)
+         results = []
+
+         def send():
+             barrier.wait()
+             results.append(ScopedTokenBucketThrottle().allow_request(make_request(), AvailabilityView()))
+
+         with mock.patch.multiple(LocMemCache, **{name: slowed(getattr(LocMemCache, name)) for name in ("add", "get", "set", "incr")}):
+             threads = [threading.Thread(target=send) for _ in range(2)]
+             for thread in threads:
+                 thread.start()
+             for thread in threads:
+                 thread.join()
+         self.assertEqual(results, [True, True], "Expected both concurrent requests to be allowed.")
+
+         throttle = ScopedTokenBucketThrottle()
+         request = make_request()
+         self.assertTrue(throttle.allow_request(request, AvailabilityView()), "Expected the next request to be allowed.")
+         self.assertIsNone(throttle.wait(), "Expected no wait after three requests on a full 30/min bucket.")
+         self.assertEqual(request._request.ratelimit["remaining"], 27, "Expected exactly three tokens to be taken after the pause.")
+
+
+class ReservationAdminTests(ReservationFixturesMixin, TestCase):
+    def setUp(self):
+         super().setUp()
+         self.reservations = [
+             Reservation.objects.create(room=self.room, user=self.user, title=f"Reservation {hour}", date=date.today(), start_time=time(hour, 0), end_time=time(hour + 1, 0))
+             for hour in (9, 10, 11)
+         ]
+         self.client.force_login(self.admin)
+
+    def test_changelist_query_count_does_not_grow_per_row(self):
+         """Test that the reservation changelist loads room and user in the same query instead of once per row."""
+         url = "/admin/reservation/reservation/"
+         with CaptureQueriesContext(connection) as queries:
+             response = self.client.get(url)
+         self.assertEqual(response.status_code, 200, "Expected 200 OK for the reservation changelist.")
+         other_user = User.objects.create_user(username="other", email="other@example.com", password="otherpass")
+         Reservation.objects.create(room=self.room, user=other_user, title="Another", date=date.today(), start_time=time(14, 0), end_time=time(15, 0))
+         with self.assertNumQueries(len(queries.captured_queries)):
+             self.client.get(url)
+
+    def test_bulk_approve_action(self):
+         """Test that the approve admin action updates all selected reservations."""
+         url = "/admin/reservation/reservation/"
+         data = {"action": "approve_reservations", "_selected_action": [r.pk for r in self.reservations[:2]]}
+         response = self.client.post(url, data)
+         self.assertEqual(response.status_code, 302, "Expected a redirect back to the changelist after the action.")
+         self.assertEqual(Reservation.objects.filter(status="confirmed").count(), 2, "Expected the two selected reservations to be approved.")
+         self.assertEqual(Reservation.objects.filter(status="pending").count(), 1, "Expected the unselected reservation to stay pending.")
+
+    def test_bulk_reject_action_queues_notifications(self):
+         """Test that the reject admin action queues one notification per reservation, like the API reject action."""
+         url = "/admin/reservation/reservation/"
+         data = {"action": "reject_reservations", "_selected_action": [r.pk for r in self.reservations[:2]]}
+         with self.captureOnCommitCallbacks(execute=True):
+             self.client.post(url, data)
+         payloads = sorted(Task.objects.values_list("payload", flat=True), key=lambda payload: payload["reservation_id"])
+         self.assertEqual(payloads, [{"reservation_id": r.pk, "event": "rejected"} for r in self.reservations[:2]], "Expected a rejected notification for each selected reservation.")
+
+
+class WarmUpTests(TestCase):
+    def test_warm_up_prepares_url_resolver_and_database(self):
+         """Test that the gunicorn warm-up hooks build the URL resolver and open the database connection."""
+         from django.urls import get_resolver
+         from conference.warmup import warm_up_app, warm_database
+         warm_up_app()
+         self.assertTrue(get_resolver()._populated, "Expected the URL resolver to be populated after warm-up.")
+         warm_database()
+         self.assertIsNotNone(connection.connection, "Expected an open database connection after warm-up.")
+
+
+@task(name="tests.always_fails")
+def always_fails():
+    raise RuntimeError("boom")
+
+
+heartbeats = []
+
+
+@task(name="tests.slow")
+def slow():
+    # Records locked_at before and after running longer than the (patched) heartbeat interval
+    heartbeats.append(Task.objects.get(name="tests.slow").locked_at)
+    time_module.sleep(0.5)
+    heartbeats.append(Task.objects.get(name="tests.slow").locked_at)
+
+
+class TaskQueueTests(ReservationFixturesMixin, TestCase):
+    def test_create_enqueues_notification_after_commit(self):
+         """Test that creating a reservation queues a notification task that the worker runs."""
+         self.client.force_authenticate(user=self.user)
+         data = {"room": self.room.id, "title": "Queued", "date": date.today().isoformat(), "start_time": time(9, 0).isoformat(), "end_time": time(10, 0).isoformat()}
+         with self.captureOnCommitCallbacks(execute=True):
+             response = self.client.post("/api/reservations/", data, format="json")
+         self.assertEqual(response.status_code, status.HTTP_201_CREATED, "Expected 201 Created when creating a reservation.")
+         self.assertEqual(len(mail.outbox), 0, "Expected no email to be sent during the request.")
+         task_obj = claim_next()
+         self.assertEqual(task_obj.name, "reservation.tasks.notify_reservation", "Expected a notification task to be queued.")
+         self.assertTrue(run_task(task_obj), "Expected the notification task to succeed.")
+         self.assertEqual(len(mail.outbox), 1, "Expected the worker to send one email.")
+         self.assertEqual(Task.objects.get(pk=task_obj.pk).status, "done", "Expected the task to be marked done.")
+
+    def test_failed_task_is_retried_with_backoff(self):
+         """Test that a failing task is rescheduled until it runs out of attempts."""
+         Task.objects.create(name="tests.always_fails", max_attempts=2)
+         run_task(claim_next())
+         task_obj = Task.objects.get()
+         self.assertEqual(task_obj.status, "pending", "Expected the task to be rescheduled after the first failure.")
+         self.assertGreater(task_obj.run_at, task_obj.created_at, "Expected the retry to be delayed.")
+         self.assertIsNone(claim_next(), "Expected the delayed retry not to be due yet.")
+         Task.objects.update(run_at=task_obj.created_at)
+         run_task(claim_next())
+         self.assertEqual(Task.objects.get().status, "failed", "Expected the task to fail after max_attempts.")
+
+
+    def test_stale_task_out_of_attempts_is_failed(self):
+         """Test that a task whose worker died on its last attempt is marked failed instead of being requeued."""
+         lost = timezone.now() - timedelta(hours=1)
+         exhausted = Task.objects.create(name="tests.slow", status="running", attempts=2, max_attempts=2, locked_at=lost)
+         retried = Task.objects.create(name="tests.slow", status="running", attempts=1, max_attempts=2, locked_at=lost)
+         requeue_stale()
+         exhausted.refresh_from_db()
+         retried.refresh_from_db()
+         self.assertEqual(exhausted.status, "failed", "Expected the task with no attempts left to be failed.")
+         self.assertEqual(exhausted.last_error, "Worker died while running the task.", "Expected the failure reason to be recorded.")
+         self.assertEqual(retried.status, "pending", "Expected the task with attempts left to be requeued.")
+         self.assertGreater(retried.run_at, timezone.now(), "Expected the requeued task to wait for the retry backoff.")
+
+    def test_old_done_tasks_are_purged(self):
+         """Test that finished tasks past the retention window are deleted, while recent and failed ones are kept."""
+         old = timezone.now() - timedelta(days=30)
+         Task.objects.create(name="tests.slow", status="done")
+         Task.objects.create(name="tests.slow", status="done", last_error="old")
+         Task.objects.create(name="tests.slow", status="failed", last_error="old failure")
+         Task.objects.filter(last_error__startswith="old").update(updated_at=old)
+         self.assertEqual(purge_done(), 1, "Expected only the old finished task to be deleted.")
+         self.assertEqual(sorted(Task.objects.values_list("status", flat=True)), ["done", "failed"], "Expected the recent and failed tasks to remain.")
+
+class TaskWorkerTests(TransactionTestCase):
+    # The worker and the heartbeat thread use their own connections, so rows must be committed
+
+    def test_worker_requeues_tasks_left_running_by_dead_worker(self):
+         """Test that the worker loop puts back a task whose worker stopped heartbeating and runs it."""
+         Task.objects.create(name="tests.slow", status="running", attempts=1, locked_at=timezone.now() - timedelta(hours=1))
+         call_command("run_tasks", once=True, stdout=StringIO())
+         task_obj = Task.objects.get()
+         self.assertEqual(task_obj.status, "pending", "Expected the stale task to be requeued.")
+         self.assertGreater(task_obj.run_at, timezone.now(), "Expected the requeued task to wait for the retry backoff.")
+         Task.objects.update(run_at=timezone.now())
+         call_command("run_tasks", once=True, stdout=StringIO())
+         self.assertEqual(Task.objects.get().status, "done", "Expected the requeued task to run once it is due.")
+
+    def test_running_task_keeps_its_lock_fresh(self):
+         """Test that the worker's heartbeat thread refreshes a long task's locked_at so it isn't mistaken for one whose worker died."""
+         heartbeats.clear()
+         Task.objects.create(name="tests.slow")
+         stop = threading.Event()
+         with mock.patch("reservation.taskqueue.HEARTBEAT_INTERVAL", timedelta(seconds=0.1)):
+             heartbeat = threading.Thread(target=heartbeat_loop, args=(stop,))
+             heartbeat.start()
+             try:
+                 run_task(claim_next())
+             finally:
+                 stop.set()
+                 heartbeat.join()
+         self.assertGreater(heartbeats[1], heartbeats[0], "Expected locked_at to be refreshed while the task runs.")
+
+
+REDIS_CACHES = {"default": {"BACKEND": "django.core.cache.backends.redis.RedisCache", "LOCATION": os.getenv("REDIS_URL", "redis://127.0.0.1:6379/0")}}
+
+
+def redis_available():
+    try:
+        import redis
+        return redis.Redis.from_url(REDIS_CACHES["default"]["LOCATION"], socket_connect_timeout=0.2).ping()
+    except Exception:
+        return False
+
+
+class AvailabilityView:
+    throttle_scope = "availability"
+
+
+def anonymous_request():
+    request = Request(APIRequestFactory().get("/api/reserved-times/"))
+    request.user = AnonymousUser()
+    return request
+
+
+@override_settings(CACHES=REDIS_CACHES, REST_FRAMEWORK={**settings.REST_FRAMEWORK, "DEFAULT_THROTTLE_RATES": {"availability": "2/min"}})
+class RedisThrottleTests(SimpleTestCase):
+    def setUp(self):
+         self.addCleanup(setattr, TokenBucketThrottle, "gcra_script", None)
+         TokenBucketThrottle.gcra_script = None
+
+    def test_redis_path_runs_registered_script(self):
+         """Test that on RedisCache the bucket is updated by the GCRA script, registered once and run with the bucket's key."""
+         client = mock.MagicMock()
+         client.register_script.return_value.return_value = [1, b"1030.0"]
+         with mock.patch.object(ScopedTokenBucketThrottle, "timer", staticmethod(lambda: 1000.0)), \
+                 mock.patch("django.core.cache.backends.redis.RedisCacheClient.get_client", return_value=client):
+             throttle = ScopedTokenBucketThrottle()
+             request = anonymous_request()
+             self.assertTrue(throttle.allow_request(request, AvailabilityView()), "Expected the script's verdict to allow the request.")
+             ScopedTokenBucketThrottle().allow_request(anonymous_request(), AvailabilityView())
+         client.register_script.assert_called_once_with(GCRA_SCRIPT)
+         script = client.register_script.return_value
+         self.assertEqual(script.call_count, 2, "Expected the script to run once per request.")
+         key = caches["default"].make_and_validate_key("throttle_bucket_availability_ip_127.0.0.1")
+         script.assert_called_with(keys=[key], args=["1000.0", "30.0", "60.0", 61], client=client)
+         self.assertEqual(request._request.ratelimit["remaining"], 1, "Expected one token left after the script moved the TAT 30s ahead.")
+
+    @skipUnless(redis_available(), "Redis server not available")
+    def test_gcra_script_on_real_redis(self):
+         """Test the GCRA Lua script against a real Redis server: a 2/min bucket allows two requests, then refuses."""
+         caches["default"].delete("throttle_bucket_availability_ip_127.0.0.1")
+         self.addCleanup(caches["default"].delete, "throttle_bucket_availability_ip_127.0.0.1")
+         results = []
+         for _ in range(3):
+             throttle = ScopedTokenBucketThrottle()
+             results.append(throttle.allow_request(anonymous_request(), AvailabilityView()))
+         self.assertEqual(results, [True, True, False], "Expected the third request on a 2/min bucket to be refused.")
+         self.assertAlmostEqual(throttle.wait(), 30, delta=1, msg="Expected to wait about one token's refill time.")
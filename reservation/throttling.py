@@ -0,0 +1,156 @@
+import math
+import time
+
+from django.core.cache import caches
+from django.core.cache.backends.redis import RedisCache
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+# GCRA update done in one atomic step on the Redis server.
+# KEYS[1]: theoretical arrival time (TAT) key
+# ARGV: now, seconds per token, bucket size in seconds (capacity * seconds per token), TTL
+# Returns {allowed, TAT after the request} (as a string so the fraction isn't truncated)
+GCRA_SCRIPT = """
+local now = tonumber(ARGV[1])
+local interval = tonumber(ARGV[2])
+local limit = tonumber(ARGV[3])
+local tat = tonumber(redis.call('GET', KEYS[1]))
+if tat == nil or tat < now then
+    tat = now
+end
+local new_tat = tat + interval
+if new_tat - now > limit then
+    return {0, tostring(tat)}
+end
+redis.call('SET', KEYS[1], tostring(new_tat), 'EX', ARGV[4])
+return {1, tostring(new_tat)}
+"""
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """
+    Token bucket throttle keyed by scope and by user (or client IP when anonymous).
+
+    A rate of "30/min" means a bucket of 30 tokens refilled at 30 tokens per minute,
+    so short bursts are allowed while the average stays within the rate. Rates are
+    read from REST_FRAMEWORK["DEFAULT_THROTTLE_RATES"] using the scope as the key.
+
+    The bucket is stored as a single "theoretical arrival time" (GCRA): each allowed
+    request pushes it forward by one token's worth of time, and a request is refused
+    when that would put it more than a full bucket ahead of now. With Redis the
+    update is one Lua script; with other cache backends it runs under a short lock
+    taken with cache.add(), so concurrent workers can't apply the same update twice.
+    """
+    cache_alias = 'default'
+    timer = time.time
+    cache_format = 'throttle_bucket_%(scope)s_%(ident)s'
+    scope = None
+    # How long a request waits for another request holding the same bucket's lock
+    lock_wait = 0.5
+    # redis-py Script for GCRA_SCRIPT, created once; it runs via EVALSHA and loads itself on NOSCRIPT
+    gcra_script = None
+
+    def get_scope(self, request, view):
+        return self.scope
+
+    def get_rate(self, scope):
+        return api_settings.DEFAULT_THROTTLE_RATES.get(scope)
+
+    def parse_rate(self, rate):
+        # Returns (capacity, tokens per second)
+        num, period = rate.split('/')
+        num_requests = int(num)
+        duration = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}[period[0]]
+        return num_requests, num_requests / duration
+
+    def get_ident(self, request):
+        if request.user and request.user.is_authenticated:
+            return f"user_{request.user.pk}"
+        return f"ip_{super().get_ident(request)}"
+
+    def allow_request(self, request, view):
+        scope = self.get_scope(request, view)
+        rate = self.get_rate(scope) if scope else None
+        if rate is None:
+            return True
+
+        capacity, refill_rate = self.parse_rate(rate)
+        interval = 1 / refill_rate
+        limit = capacity * interval
+        key = self.cache_format % {'scope': scope, 'ident': self.get_ident(request)}
+        # Keep the key until the bucket would have refilled completely
+        ttl = math.ceil(limit) + 1
+        now = self.timer()
+
+        cache = caches[self.cache_alias]
+        if isinstance(cache, RedisCache):
+            allowed, tat = self.update_redis(cache, key, now, interval, limit, ttl)
+        else:
+            allowed, tat = self.update_locked(cache, key, now, interval, limit, ttl)
+
+        if allowed:
+            self.wait_seconds = None
+            remaining = int((limit - (tat - now)) / interval + 1e-9)
+        else:
+            self.wait_seconds = tat + interval - now - limit
+            remaining = 0
+
+        self.record_state(request, scope, capacity, remaining, tat - now)
+        return allowed
+
+    def update_redis(self, cache, key, now, interval, limit, ttl):
+        cache_key = cache.make_and_validate_key(key)
+        client = cache._cache.get_client(cache_key, write=True)
+        if TokenBucketThrottle.gcra_script is None:
+            TokenBucketThrottle.gcra_script = client.register_script(GCRA_SCRIPT)
+        # get_client() returns a new Redis object per call, so pass it explicitly
+        allowed, tat = TokenBucketThrottle.gcra_script(
+            keys=[cache_key], args=[repr(now), repr(interval), repr(limit), ttl], client=client,
+        )
+        return bool(allowed), float(tat)
+
+    def update_locked(self, cache, key, now, interval, limit, ttl):
+        lock_key = f"{key}_lock"
+        deadline = time.monotonic() + self.lock_wait
+        while not cache.add(lock_key, 1, 1):
+            if time.monotonic() >= deadline:
+                # Another request is stuck holding the lock; refuse rather than skip the limit
+                return False, now + limit
+            time.sleep(0.001)
+        try:
+            tat = max(cache.get(key, now), now)
+            if tat + interval - now > limit:
+                return False, tat
+            cache.set(key, tat + interval, ttl)
+            return True, tat + interval
+        finally:
+            cache.delete(lock_key)
+
+    def record_state(self, request, scope, limit, remaining, reset):
+        # Picked up by RateLimitHeadersMiddleware; keep the most restrictive bucket
+        http_request = request._request
+        current = getattr(http_request, 'ratelimit', None)
+        if current is None or remaining < current['remaining']:
+            http_request.ratelimit = {
+                'scope': scope,
+                'limit': limit,
+                'remaining': remaining,
+                'reset': math.ceil(max(reset, 0)),
+            }
+
+    def wait(self):
+        return getattr(self, 'wait_seconds', None)
+
+
+class ScopedTokenBucketThrottle(TokenBucketThrottle):
+    """
+    Picks the bucket from the view: its `throttle_scope` attribute if set, otherwise
+    "writes" for unsafe methods and "reads" for everything else.
+    """
+
+    def get_scope(self, request, view):
+        scope = getattr(view, 'throttle_scope', None)
+        if scope:
+            return scope
+        return 'reads' if request.method in SAFE_METHODS else 'writes'
@@ -11,6 +11,9 @@ from django.utils import timezone
 from datetime import timedelta, datetime, time
 from rest_framework import serializers
 from rest_framework_simplejwt.views import TokenObtainPairView
+from .idempotency import idempotent
+from .taskqueue import enqueue
+from .tasks import notify_reservation
 
 # Create your views here.
 
@@ -28,6 +31,10 @@ class ReservationViewSet(viewsets.ModelViewSet):
             return Reservation.objects.all()
         return Reservation.objects.filter(user=user)
 
+    @idempotent
+    def create(self, request, *args, **kwargs):
+        return super().create(request, *args, **kwargs)
+
     def perform_create(self, serializer):
         data = serializer.validated_data
         room = data.get("room")
@@ -40,21 +47,27 @@ class ReservationViewSet(viewsets.ModelViewSet):
         ).exists()
         if overlap:
             raise serializers.ValidationError("A reservation with overlapping time range already exists for this room and date.")
-        serializer.save(user=self.request.user)
+        reservation = serializer.save(user=self.request.user)
+        # Side effects run in the task worker once the reservation is committed
+        enqueue(notify_reservation, reservation_id=reservation.pk, event='created')
 
     @action(detail=True, methods=['post'], permission_classes=[IsAdminUser])
+    @idempotent
     def approve(self, request, pk=None):
         reservation = self.get_object()
         reservation.status = 'confirmed'
         reservation.save()
+        enqueue(notify_reservation, reservation_id=reservation.pk, event='approved')
         serializer = self.get_serializer(reservation)
         return Response(serializer.data)
 
     @action(detail=True, methods=['post'], permission_classes=[IsAdminUser])
+    @idempotent
     def reject(self, request, pk=None):
         reservation = self.get_object()
         reservation.status = 'cancelled'
         reservation.save()
+        enqueue(notify_reservation, reservation_id=reservation.pk, event='rejected')
         serializer = self.get_serializer(reservation)
         return Response(serializer.data)
 
@@ -64,6 +77,8 @@ class UserViewSet(viewsets.ModelViewSet):
     permission_classes = [IsAuthenticated]
 
 class get_reserved_times(APIView):
+    throttle_scope = 'availability'
+
     def get(self, request):
         room = request.query_params.get('room')
         date = request.query_params.get('date')
@@ -78,6 +93,8 @@ class get_reserved_times(APIView):
         return Response(reserved_times)
 
 class get_available_dates(APIView):
+    throttle_scope = 'availability'
+
     def get(self, request):
          room = request.query_params.get('room')
          if not room:
@@ -117,6 +134,7 @@ class CurrentUserView(APIView):
 class RegisterView(APIView):
     permission_classes = [AllowAny]
     serializer_class = RegisterSerializer
+    throttle_scope = 'auth'
 
     def post(self, request):
         serializer = self.serializer_class(data=request.data)
@@ -130,6 +148,7 @@ class RegisterView(APIView):
 
 class CustomTokenObtainPairView(TokenObtainPairView):
     serializer_class = CustomTokenObtainPairSerializer
+    throttle_scope = 'auth'
 
 class MyReservationsView(APIView):
     permission_classes = [IsAuthenticated]